@@ -16,13 +16,16 @@ The script only requires Pillow which can be installed with
 from __future__ import annotations
 
 import argparse
+import math
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from pathlib import Path
 from typing import Optional, Tuple, cast
 
-from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageOps
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
 
-from tools import clamp, parse_color, stabilise_mesh
+from tools import parse_color, stabilise_mesh
 import cv2
 import numpy as np
 
@@ -38,10 +41,19 @@ except AttributeError:  # pragma: no cover - compatibility for older Pillow
 
 Color = Tuple[int, int, int]
 
+# Soft shapes are downsampled until their blur radius is roughly this many
+# pixels, which keeps large blurs cheap without visible loss.  Any blur of ten
+# pixels or more is therefore rendered at half resolution or less.
+SOFT_SHAPE_REDUCED_RADIUS = 5
+
 DEBUG_MODE = True
-@dataclass
+@dataclass(frozen=True)
 class BottleGeometry:
-    """Holds the key measurements that define the bottle layout."""
+    """Holds the key measurements that define the bottle layout.
+
+    The geometry is immutable, so every derived box is computed once and
+    cached, and instances can key the layer caches directly.
+    """
 
     canvas_size: Tuple[int, int] = (900, 1400)
     body_width_ratio: float = 0.38
@@ -51,6 +63,7 @@ class BottleGeometry:
     shoulder_height_ratio: float = 0.06
     cap_height_ratio: float = 0.055
 
+    @cached_property
     def body_box(self) -> Tuple[float, float, float, float]:
         width, height = self.canvas_size
         body_width = width * self.body_width_ratio
@@ -59,17 +72,19 @@ class BottleGeometry:
         left = width / 2 - body_width / 2
         return (left, top, left + body_width, top + body_height)
 
+    @cached_property
     def neck_box(self) -> Tuple[float, float, float, float]:
         width, height = self.canvas_size
         neck_width = width * self.neck_width_ratio 
-        body_top = self.body_box()[1]
+        body_top = self.body_box[1]
         neck_height = height * self.neck_height_ratio
         left = width / 2 - neck_width / 2
         return (left, body_top - neck_height, left + neck_width, body_top)
 
+    @cached_property
     def shoulder_box(self) -> Tuple[float, float, float, float]:
         width, height = self.canvas_size
-        body = self.body_box()
+        body = self.body_box
         shoulder_height = height * self.shoulder_height_ratio
         left = body[0] - (body[2] - body[0]) * 0
         right = body[2] + (body[2] - body[0]) * 0
@@ -77,8 +92,9 @@ class BottleGeometry:
         bottom = body[1] + shoulder_height * 1.5
         return (left, top, right, bottom)
 
+    @cached_property
     def cap_box(self) -> Tuple[float, float, float, float]:
-        neck = self.neck_box()
+        neck = self.neck_box
         height = self.canvas_size[1]
         cap_height = height * self.cap_height_ratio
         neck_center = (neck[0] + neck[2]) / 2
@@ -87,8 +103,9 @@ class BottleGeometry:
         on_neck = cap_height * 0.25
         return (left, neck[1] - cap_height + on_neck, left + cap_width, neck[1] + on_neck)
 
+    @cached_property
     def label_box(self) -> Tuple[int, int, int, int]:
-        body = self.body_box()
+        body = self.body_box
         width = body[2] - body[0]
         height = body[3] - body[1]
         label_width = int(width)
@@ -102,32 +119,116 @@ class BottleGeometry:
             label_left + label_width,
             label_top + label_height,
         )
-    
+
+
+# Shared default layout: its boxes are computed once per process and it keys
+# the layer caches, so repeated runs reuse everything derived from it.
+DEFAULT_GEOMETRY = BottleGeometry()
+
+
+def soft_blur(image: Image.Image, radius: float) -> Image.Image:
+    """Approximate ``GaussianBlur(radius)`` with three OpenCV box filter passes.
+
+    :func:`cv2.boxFilter` uses a sliding sum, so its cost does not grow with
+    the kernel size.  The kernels are odd integer widths, mixing two adjacent
+    sizes so the cascade has the same variance as the Gaussian.
+    """
+
+    passes = 3
+    variance = 12 * radius * radius
+    narrow = int(math.sqrt(variance / passes + 1))
+    if narrow % 2 == 0:
+        narrow -= 1
+    narrow = max(1, narrow)
+    narrow_passes = round((variance - passes * narrow * narrow - 4 * passes * narrow - 3 * passes) / (-4 * narrow - 4))
+
+    pixels = np.asarray(image)
+    for index in range(passes):
+        size = narrow if index < narrow_passes else narrow + 2
+        pixels = cv2.boxFilter(pixels, -1, (size, size), borderType=cv2.BORDER_REPLICATE)
+    return Image.fromarray(pixels, image.mode)
+
+
+def composite_soft_shape(
+    target: Image.Image,
+    box: Tuple[float, float, float, float],
+    fill: Tuple[int, int, int, int],
+    blur_radius: float,
+    corner_radius: Optional[float] = None,
+) -> None:
+    """Blend a blurred ellipse (or rounded rectangle) onto *target* in place.
+
+    Only the shape's bounding box, padded by three blur radii, is rendered;
+    the blur has faded to nothing beyond that.  Large blurs also leave nothing
+    but low frequencies behind, so the tile is box-downsampled by an integer
+    factor with :py:meth:`Image.Image.reduce`, blurred with a radius of about
+    :data:`SOFT_SHAPE_REDUCED_RADIUS` and upsampled once before compositing.
+    """
+
+    factor = max(1, int(blur_radius // SOFT_SHAPE_REDUCED_RADIUS))
+    pad = 3 * blur_radius
+    left = max(0, math.floor(box[0] - pad))
+    top = max(0, math.floor(box[1] - pad))
+    # Round the tile up to whole multiples of the factor so the reduced tile
+    # maps back onto the canvas without a fractional offset.
+    tile_size = (
+        math.ceil((min(target.width, box[2] + pad) - left) / factor) * factor,
+        math.ceil((min(target.height, box[3] + pad) - top) / factor) * factor,
+    )
+    tile = Image.new("RGBA", tile_size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(tile)
+    tile_box = (box[0] - left, box[1] - top, box[2] - left, box[3] - top)
+    if corner_radius is None:
+        draw.ellipse(tile_box, fill=fill)
+    else:
+        draw.rounded_rectangle(tile_box, radius=corner_radius, fill=fill)
+    if factor > 1:
+        tile = tile.reduce(factor)
+    tile = soft_blur(tile, blur_radius / factor)
+    if factor > 1:
+        tile = tile.resize(tile_size, RESAMPLE_LANCZOS)
+    target.alpha_composite(tile, dest=(left, top))
+
+
 def draw_bottle(geometry: BottleGeometry, bottle_color: Color, cap_color: Color) -> Image.Image:
+    """Return the bottle silhouette as an RGBA image.
+
+    The layer only depends on the geometry and the two colours, so renders are
+    memoised and every caller receives its own copy of the cached image.
+    """
+
+    return _cached_bottle_layer(geometry, tuple(bottle_color), tuple(cap_color)).copy()
+
+
+@lru_cache(maxsize=8)
+def _cached_bottle_layer(geometry: BottleGeometry, bottle_color: Color, cap_color: Color) -> Image.Image:
+    return render_bottle(geometry, bottle_color, cap_color)
+
+
+def render_bottle(geometry: BottleGeometry, bottle_color: Color, cap_color: Color) -> Image.Image:
     """Render the bottle silhouette and return it as an RGBA image."""
 
     width, height = geometry.canvas_size
     bottle_layer = Image.new("RGBA", (width, height), (0, 0, 0, 0))
     draw = ImageDraw.Draw(bottle_layer)
 
-    body = geometry.body_box()
+    body = geometry.body_box
     bottle_rgba = bottle_color + (90,)
     draw.rounded_rectangle(body, radius=(body[2] - body[0]) * 0.18, fill=bottle_rgba)
 
-    neck = geometry.neck_box()
+    neck = geometry.neck_box
     draw.rounded_rectangle(neck, radius=(neck[2] - neck[0]) * 0.3, fill=bottle_rgba)
 
-    shoulder = geometry.shoulder_box()
+    shoulder = geometry.shoulder_box
     draw.ellipse(shoulder, fill=bottle_rgba)
-    cap = geometry.cap_box()
-    cap_layer = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    cap_draw = ImageDraw.Draw(cap_layer)
+    # The cap is opaque, so it is drawn straight onto the bottle layer.
+    cap = geometry.cap_box
     cap_rgba = cap_color + (255,)
-    cap_draw.rounded_rectangle(cap, radius=(cap[2] - cap[0]) * 0.25, fill=cap_rgba)
+    draw.rounded_rectangle(cap, radius=(cap[2] - cap[0]) * 0.25, fill=cap_rgba)
 
     # Add subtle top ellipse for the cap and soft highlight.
     top_height = (cap[3] - cap[1]) * 0.35
-    cap_draw.ellipse(
+    draw.ellipse(
         (
             cap[0] + (cap[2] - cap[0]) * 0.08,
             cap[1] - top_height * 0.4,
@@ -137,45 +238,51 @@ def draw_bottle(geometry: BottleGeometry, bottle_color: Color, cap_color: Color)
         fill=(255, 255, 255, 80),
     )
 
-    # Add vertical grip stripes with a gentle blur to mimic injection-moulded plastic.
-    stripe_layer = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    stripe_draw = ImageDraw.Draw(stripe_layer)
-    stripe_count = 12
     cap_width = cap[2] - cap[0]
     cap_height = cap[3] - cap[1]
+
+    # Add vertical grip stripes with a gentle blur to mimic injection-moulded
+    # plastic.  They stay within a few blur radii of the cap, so they are drawn
+    # on a tile covering just that region and composited back in place.  The
+    # tile starts on even coordinates: Pillow rasterises rounded rectangles
+    # the same under an even shift, so the stripes match drawing them on the
+    # full canvas.
+    stripe_count = 12
+    stripe_blur = 3
+    tile_x = max(0, (math.floor(cap[0]) - 4 * stripe_blur) // 2 * 2)
+    tile_y = max(0, (math.floor(cap[1]) - 4 * stripe_blur) // 2 * 2)
+    cap_tile = Image.new(
+        "RGBA",
+        (
+            min(width, math.ceil(cap[2]) + 4 * stripe_blur) - tile_x,
+            min(height, math.ceil(cap[3]) + 4 * stripe_blur) - tile_y,
+        ),
+        (0, 0, 0, 0),
+    )
+    tile_draw = ImageDraw.Draw(cap_tile)
     for i in range(stripe_count):
         mix = (i + 0.5) / stripe_count
         center_emphasis = 1 - abs(mix - 0.5) * 2
         alpha = int(65 + 70 * center_emphasis)
         stripe_left = cap[0] + cap_width * i / stripe_count
         stripe_right = stripe_left + cap_width / (stripe_count * 2.2)
-        stripe_draw.rounded_rectangle(
+        tile_draw.rounded_rectangle(
             (
-                stripe_left,
-                cap[1] + cap_height * 0.1,
-                stripe_right,
-                cap[3] - cap_height * 0.1,
+                stripe_left - tile_x,
+                cap[1] + cap_height * 0.1 - tile_y,
+                stripe_right - tile_x,
+                cap[3] - cap_height * 0.1 - tile_y,
             ),
             radius=cap_height * 0.15,
             fill=(255, 255, 255, alpha),
         )
-    stripe_layer = stripe_layer.filter(ImageFilter.GaussianBlur(radius=3))
-    cap_layer = Image.alpha_composite(cap_layer, stripe_layer)
-
-    # Horizontal ridges mimic screw threads.
-    ridge_count = 5
-    for i in range(ridge_count):
-        y = cap[1] + (cap[3] - cap[1]) * (i + 1) / (ridge_count + 1)
-        cap_draw.line(
-            [(cap[0] + 4, y), (cap[2] - 4, y)],
-            fill=(255, 255, 255, 90 if i % 2 == 0 else 60),
-            width=1,
-        )
+    bottle_layer.alpha_composite(
+        cap_tile.filter(ImageFilter.GaussianBlur(radius=stripe_blur)), dest=(tile_x, tile_y)
+    )
 
     # Emphasise lighting with a bright highlight on the left and a shadow on the right.
-    cap_highlight = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    cap_highlight_draw = ImageDraw.Draw(cap_highlight)
-    cap_highlight_draw.ellipse(
+    composite_soft_shape(
+        bottle_layer,
         (
             cap[0] + cap_width * 0.08,
             cap[1] + cap_height * 0.15,
@@ -183,43 +290,39 @@ def draw_bottle(geometry: BottleGeometry, bottle_color: Color, cap_color: Color)
             cap[3] - cap_height * 0.1,
         ),
         fill=(255, 255, 255, 140),
+        blur_radius=8,
     )
-    cap_highlight = cap_highlight.filter(ImageFilter.GaussianBlur(radius=8))
-    cap_layer = Image.alpha_composite(cap_layer, cap_highlight)
 
-    cap_shadow = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    cap_shadow_draw = ImageDraw.Draw(cap_shadow)
-    cap_shadow_draw.rounded_rectangle(
+    # The shadow's blur is wide enough to be rendered at reduced resolution.
+    composite_soft_shape(
+        bottle_layer,
         (
             cap[0] + cap_width * 0.55,
             cap[1] + cap_height * 0.05,
             cap[2] - cap_width * 0.05,
             cap[3] - cap_height * 0.05,
         ),
-        radius=cap_height * 0.2,
         fill=(0, 0, 0, 120),
+        blur_radius=10,
+        corner_radius=cap_height * 0.2,
     )
-    cap_shadow = cap_shadow.filter(ImageFilter.GaussianBlur(radius=10))
-    cap_layer = Image.alpha_composite(cap_layer, cap_shadow)
-
-    bottle_layer = Image.alpha_composite(bottle_layer, cap_layer)
 
     # Interior refraction glow.
-    refraction = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    refraction_draw = ImageDraw.Draw(refraction)
     inner_box = (
         body[0] + (body[2] - body[0]) * 0.08,
         body[1] + (body[3] - body[1]) * 0.1,
         body[2] - (body[2] - body[0]) * 0.08,
         body[3] - (body[3] - body[1]) * 0.15,
     )
-    refraction_draw.rounded_rectangle(inner_box, radius=(inner_box[2] - inner_box[0]) * 0.3, fill=(255, 255, 255, 70))
-    refraction = refraction.filter(ImageFilter.GaussianBlur(radius=60))
-    bottle_layer = Image.alpha_composite(bottle_layer, refraction)
+    composite_soft_shape(
+        bottle_layer,
+        inner_box,
+        fill=(255, 255, 255, 70),
+        blur_radius=60,
+        corner_radius=(inner_box[2] - inner_box[0]) * 0.3,
+    )
 
     # Add a soft highlight on the left side of the bottle to simulate lighting.
-    highlight = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    highlight_draw = ImageDraw.Draw(highlight)
     body_width = body[2] - body[0]
     highlight_box = (
         int(body[0] + body_width * 0.05),
@@ -227,60 +330,102 @@ def draw_bottle(geometry: BottleGeometry, bottle_color: Color, cap_color: Color)
         int(body[0] + body_width * 0.35),
         int(body[3] - (body[3] - body[1]) * 0.15),
     )
-    highlight_draw.ellipse(highlight_box, fill=(255, 255, 255, 150))
-    highlight = highlight.filter(ImageFilter.GaussianBlur(radius=40))
-    bottle_layer = Image.alpha_composite(bottle_layer, highlight)
+    composite_soft_shape(bottle_layer, highlight_box, fill=(255, 255, 255, 150), blur_radius=40)
 
     # Subtle darker edge on the right for depth.
-    shadow = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    shadow_draw = ImageDraw.Draw(shadow)
     shadow_box = (
         int(body[2] - body_width * 0.3),
         int(body[1] + (body[3] - body[1]) * 0.1),
         int(body[2] + body_width * 0.1),
         int(body[3]),
     )
-    shadow_draw.ellipse(shadow_box, fill=(0, 0, 0, 110))
-    shadow = shadow.filter(ImageFilter.GaussianBlur(radius=50))
-    bottle_layer = Image.alpha_composite(bottle_layer, shadow)
+    composite_soft_shape(bottle_layer, shadow_box, fill=(0, 0, 0, 110), blur_radius=50)
 
     return bottle_layer
 
 
+@lru_cache(maxsize=8)
+def curve_maps(
+    W: int, H: int, theta_max: float, vertical_bulge: float, passes: int = 1
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the read-only ``cv2.remap`` maps that wrap a W×H label round the bottle.
+
+    Warping an already warped label samples it at the source coordinates of
+    the previous pass, so feeding the coordinates through the curvature
+    transform *passes* times yields a single map equivalent to remapping that
+    many times.  The maps only depend on the label size and the curvature
+    parameters, and every crop of a run shares them, so they are cached.
+    """
+
+    # The horizontal transform only depends on the column, so it runs on a
+    # single row; only the vertical offset is broadcast over the whole map.
+    X = np.linspace(-0.5, 0.5, W, dtype=np.float32)
+    Y = np.linspace(0, 1, H, dtype=np.float32)[:, None]
+
+    for _ in range(passes):
+        theta = np.arcsin(np.clip(X * (math.sin(theta_max) / 0.5), -0.999999, 0.999999))
+        Y = np.clip(Y - vertical_bulge * (1 - np.cos(theta)), 0, 1)
+        X = (theta + theta_max) * (1 / (2 * theta_max)) - 0.5
+
+    map_x = np.tile((X + 0.5) * (W - 1), (H, 1))
+    map_y = Y * (H - 1)
+
+    map_x.flags.writeable = False
+    map_y.flags.writeable = False
+    return map_x, map_y
+
+
+@lru_cache(maxsize=8)
+def curve_displacement(
+    W: int, H: int, theta_max: float, vertical_bulge: float, passes: int = 1
+) -> float:
+    """Return how far, in pixels, the maps from :func:`curve_maps` move any pixel."""
+
+    map_x, map_y = curve_maps(W, H, theta_max, vertical_bulge, passes)
+    # map_x repeats a single row, so one row gives every horizontal offset.
+    dx = np.abs(map_x[0] - np.arange(W, dtype=np.float32)).max()
+    dy = np.abs(map_y - np.arange(H, dtype=np.float32)[:, None]).max()
+    return float(max(dx, dy))
+
+
 def curve_label(label_pil: Image.Image, 
                 theta_max: float = 1.2, 
-                vertical_bulge: float = 0.12) -> Image.Image:
-    # --- Pillow -> NumPy (RGBA → BGRA) ---
-    label_np = np.array(label_pil)
-    if label_np.ndim == 2:
-        label_bgr = cv2.cvtColor(label_np, cv2.COLOR_GRAY2BGR)
-    elif label_np.shape[2] == 4:
-        label_bgr = cv2.cvtColor(label_np, cv2.COLOR_RGBA2BGRA)
-    else:
-        label_bgr = cv2.cvtColor(label_np, cv2.COLOR_RGB2BGR)
+                vertical_bulge: float = 0.12,
+                passes: int = 1) -> Image.Image:
+    # --- Pillow -> NumPy ---
+    # cv2.remap does not care about channel order, so the RGB(A) buffer is
+    # warped as is; other modes are expanded first, as before.
+    if label_pil.mode not in ("RGB", "RGBA"):
+        label_pil = label_pil.convert("RGBA" if "A" in label_pil.getbands() else "RGB")
+    label_np = np.asarray(label_pil)
 
     # --- Здесь вызываем remap (код из прошлого примера) ---
-    H, W = label_bgr.shape[:2]
-    xs = np.linspace(-0.5, 0.5, W, dtype=np.float32)
-    ys = np.linspace(0, 1, H, dtype=np.float32)
-    X, Y = np.meshgrid(xs, ys)
-    sin_th = X / 0.5 * np.sin(theta_max)
-    sin_th = np.clip(sin_th, -0.999999, 0.999999)
-    theta = np.arcsin(sin_th)
-    u = (theta + theta_max) / (2 * theta_max)
-    y_offset = vertical_bulge * (1 - np.cos(theta))
-    v = np.clip(Y - y_offset, 0, 1)
-    map_x = (u * (W - 1)).astype(np.float32)
-    map_y = (v * (H - 1)).astype(np.float32)
-
-    warped = cv2.remap(label_bgr, map_x, map_y,
+    H, W = label_np.shape[:2]
+    # A warp that moves no pixel by half a pixel or more is invisible.
+    if curve_displacement(W, H, theta_max, vertical_bulge, passes) < 0.5:
+        return label_pil.copy()
+    map_x, map_y = curve_maps(W, H, theta_max, vertical_bulge, passes)
+
+    warped = cv2.remap(label_np, map_x, map_y,
                        interpolation=cv2.INTER_CUBIC,
                        borderMode=cv2.BORDER_REPLICATE)
 
-    # --- NumPy -> Pillow (BGR → RGB) ---
-    warped_rgb = cv2.cvtColor(warped, cv2.COLOR_BGRA2RGBA) if warped.shape[2] == 4 else cv2.cvtColor(warped, cv2.COLOR_BGR2RGB)
-    return Image.fromarray(warped_rgb)
+    # --- NumPy -> Pillow ---
+    return Image.fromarray(warped, label_pil.mode)
+
+
 
+@lru_cache(maxsize=64)
+def fade_row(width: int) -> np.ndarray:
+    """Return the read-only per-column alpha ramp used to fade label edges."""
+
+    gradient_width = max(1, int(width * 0.4))
+    ramp = 255 - np.floor(255 * (1 - np.arange(gradient_width) / gradient_width * 0.97))
+    row = np.full(width, 255, dtype=np.uint8)
+    row[:gradient_width] = ramp
+    row[width - gradient_width:] = ramp[::-1]
+    row.flags.writeable = False
+    return row
 
 
 def prepare_label(
@@ -300,83 +445,161 @@ def prepare_label(
         centering=(crop_position, 0.5),
     )
 
-    label = curve_label(label)
-    label = curve_label(label)
+    # Both curvature passes are folded into a single remap.
+    label = curve_label(label, passes=2)
 
-    # Simulate the curvature of the bottle by fading the edges slightly.
-    fade = Image.new("L", label.size, color=255)
-    fade_draw = ImageDraw.Draw(fade)
-    w, h = label.size
-    gradient_width = max(1, int(w * 0.4))
-    for i in range(gradient_width):
-        alpha = 255 - int(255 * (1 - i / gradient_width * 0.97))
-        fade_draw.line([(i, 0), (i, h)], fill=alpha)
-        fade_draw.line([(w - 1 - i, 0), (w - 1 - i, h)], fill=alpha)
-    label.putalpha(ImageChops.multiply(label.split()[-1], fade))
+    # Simulate the curvature of the bottle by fading the edges slightly.  The
+    # fade only varies horizontally, so a single cached row is broadcast
+    # against the alpha band.
+    alpha = np.asarray(label.getchannel("A"), dtype=np.uint16)
+    alpha = (alpha * fade_row(label.width) // 255).astype(np.uint8)
+    label.putalpha(Image.fromarray(alpha, "L"))
 
     return label
 
 
-def compose_scene(
-    label_image: Image.Image,
+def compose_background(
+    background_image: Image.Image,
     bottle_layer: Image.Image,
     geometry: BottleGeometry,
-    background_image: Image.Image,
 ) -> Image.Image:
-    """Combine the background, bottle and label layers."""
+    """Fit the background to the canvas and lay the bottle over it.
+
+    Nothing here depends on the label, so this is done once per run and every
+    crop starts from a copy.  Opaque backgrounds produce an RGB scene: with
+    nothing able to show through, masked pastes blend colour only and the drop
+    shadow can be skipped.
+    """
+
+    scene = ImageOps.fit(background_image, geometry.canvas_size, method=Image.Resampling.BICUBIC)
+    opaque = "A" not in scene.getbands() and "transparency" not in scene.info
+    scene_mode = "RGB" if opaque else "RGBA"
+    if scene.mode != scene_mode:
+        scene = scene.convert(scene_mode)
+
+    # Composite only the part of the canvas the bottle actually covers.
+    bottle_bounds = bottle_layer.getbbox()
+    if opaque:
+        if bottle_bounds is not None:
+            bottle = bottle_layer.crop(bottle_bounds)
+            scene.paste(bottle, bottle_bounds[:2], bottle)
+        return scene
+
+    if bottle_bounds is not None:
+        scene.alpha_composite(bottle_layer, dest=bottle_bounds[:2], source=bottle_bounds)
+
+    # The drop shadow sits underneath everything else, so it can only show
+    # through where the scene is still transparent.  The label lies within
+    # the bottle body, which never covers the canvas edges, so checking before
+    # the label is added gives the same answer.
+    if scene.getchannel("A").getextrema()[0] < 255:
+        scene = Image.alpha_composite(drop_shadow_layer(geometry), scene)
+
+    return scene
 
-    background = ImageOps.fit(background_image, geometry.canvas_size, method=Image.Resampling.BICUBIC).convert("RGBA")
-    scene = Image.alpha_composite(background, bottle_layer)
 
-    label_box = geometry.label_box()
+def compose_scene(
+    label_image: Image.Image,
+    base: Image.Image,
+    geometry: BottleGeometry,
+) -> Image.Image:
+    """Place the label on a copy of the scene built by :func:`compose_background`."""
+
+    label_box = geometry.label_box
     label_left, label_top = label_box[:2]
     label_position = (
         label_left + (label_box[2] - label_box[0] - label_image.width) // 2,
         label_top + (label_box[3] - label_box[1] - label_image.height) // 2,
     )
-    scene.paste(label_image, label_position, label_image)
 
-    # Subtle drop shadow for the bottle.
+    scene = base.copy()
+    if scene.mode == "RGB":
+        scene.paste(label_image, label_position, label_image)
+    else:
+        scene.alpha_composite(label_image, dest=label_position)
+    return scene
+
+
+@lru_cache(maxsize=8)
+def drop_shadow_layer(geometry: BottleGeometry) -> Image.Image:
+    """Return the soft shadow cast beneath the bottle.
+
+    The layer is cached per geometry and shared between callers, so it must
+    not be modified.
+    """
+
     shadow = Image.new("RGBA", geometry.canvas_size, (0, 0, 0, 0))
-    shadow_draw = ImageDraw.Draw(shadow)
-    body = geometry.body_box()
+    body = geometry.body_box
     shadow_box = (
         int(body[0] - (body[2] - body[0]) * 0.1),
         int(body[3] + (geometry.canvas_size[1] - body[3]) * 0.02),
         int(body[2] + (body[2] - body[0]) * 0.1),
         int(body[3] + (geometry.canvas_size[1] - body[3]) * 0.08),
     )
-    shadow_draw.ellipse(shadow_box, fill=(0, 0, 0, 120))
-    shadow = shadow.filter(ImageFilter.GaussianBlur(radius=30))
-    scene = Image.alpha_composite(shadow, scene)
-
-    return scene
+    composite_soft_shape(shadow, shadow_box, fill=(0, 0, 0, 120), blur_radius=30)
+    return shadow
 
 
 def average_label_color(label_image: Image.Image) -> Color:
     """Return the average colour of the label, respecting transparency."""
 
-    rgba = np.array(label_image.convert("RGBA"), dtype=np.float32)
-    rgb = rgba[..., :3]
-    alpha = rgba[..., 3:4] / 255.0
-    alpha_sum = float(alpha.sum())
+    # Integer accumulation straight off the uint8 buffer: each product fits in
+    # 16 bits and the uint64 dot products cannot overflow for any label size.
+    rgba = np.asarray(label_image.convert("RGBA")).reshape(-1, 4)
+    alpha = rgba[:, 3].astype(np.uint64)
+    alpha_sum = int(alpha.sum())
 
     if alpha_sum > 0:
-        weighted_sum = (rgb * alpha).sum(axis=(0, 1))
-        mean = weighted_sum / alpha_sum
+        weighted_sum = [int(np.dot(alpha, rgba[:, channel].astype(np.uint64))) for channel in range(3)]
+        mean = [total / alpha_sum for total in weighted_sum]
     else:
-        mean = rgb.mean(axis=(0, 1))
+        mean = rgba[:, :3].mean(axis=0)
 
-    mean_tuple = tuple(int(round(clamp(float(c), 0, 255))) for c in mean)
+    mean_tuple = tuple(np.clip(np.rint(mean), 0, 255).astype(np.uint8).tolist())
     return cast(Color, mean_tuple)
 
 
+def open_image(path: Path, min_size: Tuple[int, int]) -> Image.Image:
+    """Open and decode *path*, letting JPEG decoding downscale while still covering *min_size*.
+
+    Every input is later fitted to a much smaller box, so a large JPEG can be
+    decoded at 1/2, 1/4 or 1/8 scale through :py:meth:`Image.Image.draft`,
+    which skips most of the DCT work.  The draft size keeps the aspect ratio,
+    so the fitted crop still has at least *min_size* pixels.  The image is
+    loaded eagerly so the decode happens on the calling thread.
+    """
+
+    image = Image.open(path)
+    if image.format == "JPEG":
+        width, height = image.size
+        scale = max(min_size[0] / width, min_size[1] / height)
+        image.draft(image.mode, (math.ceil(width * scale), math.ceil(height * scale)))
+    image.load()
+    return image
+
+
 def variant_output_path(base_path: Path, variant: str) -> Path:
     suffix = base_path.suffix or ".png"
     stem = base_path.stem
     return base_path.with_name(f"{stem}_{variant}{suffix}")
 
 
+def save_image(image: Image.Image, path: Path) -> None:
+    """Write *image* to *path* through OpenCV's encoders.
+
+    libpng via :func:`cv2.imwrite` at compression level 3 encodes the large
+    scenes noticeably faster than Pillow's default PNG writer.
+    """
+
+    pixels = np.asarray(image)
+    if image.mode == "RGBA":
+        pixels = cv2.cvtColor(pixels, cv2.COLOR_RGBA2BGRA)
+    elif image.mode == "RGB":
+        pixels = cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)
+    if not cv2.imwrite(str(path), pixels, [cv2.IMWRITE_PNG_COMPRESSION, 3]):
+        raise OSError(f"Could not write image to '{path}'.")
+
+
 def generate_bottle(
     label_path: Path,
     background_path: Path,
@@ -386,22 +609,33 @@ def generate_bottle(
 ) -> None:
     """High level function that orchestrates the bottle generation for three crops."""
 
-    geometry = BottleGeometry()
-    label_image = Image.open(label_path).convert("RGBA")
-    background_image = Image.open(background_path)
-
-    if cap_color is None:
-        cap_color = average_label_color(label_image)
+    geometry = DEFAULT_GEOMETRY
+    label_box = geometry.label_box
+    # Keep twice the label box resolution so the curvature warp has detail to spare.
+    label_size = (2 * (label_box[2] - label_box[0]), 2 * (label_box[3] - label_box[1]))
 
     if output_path.suffix == "":
         output_path = output_path.with_suffix(".png")
 
-    bottle_layer = draw_bottle(geometry, bottle_color, cap_color)
-
-    for variant_name, crop_position in (("left", 0.0), ("center", 0.5), ("right", 1.0)):
-        prepared_label = prepare_label(label_image, geometry.label_box(), crop_position)
-        scene = compose_scene(prepared_label, bottle_layer, geometry, background_image)
-        scene.save(variant_output_path(output_path, variant_name))
+    # Decoding, warping and bottle rendering are independent of each other and
+    # Pillow/OpenCV release the GIL while they work, so overlap them.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        background_future = executor.submit(open_image, background_path, geometry.canvas_size)
+        label_image = open_image(label_path, label_size).convert("RGBA")
+
+        if cap_color is None:
+            cap_color = average_label_color(label_image)
+        bottle_future = executor.submit(draw_bottle, geometry, bottle_color, cap_color)
+
+        label_futures = [
+            (variant_name, executor.submit(prepare_label, label_image, label_box, crop_position))
+            for variant_name, crop_position in (("left", 0.0), ("center", 0.5), ("right", 1.0))
+        ]
+        base = compose_background(background_future.result(), bottle_future.result(), geometry)
+
+        for variant_name, label_future in label_futures:
+            scene = compose_scene(label_future.result(), base, geometry)
+            save_image(scene, variant_output_path(output_path, variant_name))
 
 
 def build_parser() -> argparse.ArgumentParser:
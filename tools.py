@@ -3,21 +3,30 @@
 from __future__ import annotations
 
 import argparse
+from functools import lru_cache
 from typing import Iterable, Sequence, Tuple
 
+import numpy as np
 from PIL import ImageColor
 
 Color = Tuple[int, int, int]
 
 
 def clamp(value: float, minimum: float, maximum: float) -> float:
-    """Clamp *value* into the inclusive range [minimum, maximum]."""
+    """Clamp *value* into the inclusive range [minimum, maximum].
+
+    This is meant for single scalars; clamp arrays with :func:`numpy.clip`.
+    """
 
     return max(minimum, min(maximum, value))
 
 
+@lru_cache(maxsize=256)
 def parse_color(value: str) -> Color:
-    """Parse a color value accepted by Pillow (name or hex)."""
+    """Parse a color value accepted by Pillow (name or hex).
+
+    Results are memoised, so repeated colours in batch runs are parsed once.
+    """
 
     try:
         r, g, b = ImageColor.getrgb(value)
@@ -38,23 +47,28 @@ def stabilise_mesh(
     keeping at least one pixel of width so adjacent slices line up cleanly.
     """
 
-    stabilised = []
-    previous_right = 0
-    for bbox, quad in mesh:
-        left, top, right, bottom = bbox
-        left_i = max(previous_right, int(round(left)))
-        right_i = int(round(right))
-        if right_i <= left_i:
-            right_i = left_i + 1
-        previous_right = right_i
-        stabilised.append(((left_i, int(round(top)), right_i, int(round(bottom))), tuple(float(x) for x in quad)))
-
-    if stabilised:
-        # Force the last slice to end exactly at the expected width so there is
-        # no visible gap caused by rounding error.
-        last_bbox, last_quad = stabilised[-1]
-        if last_bbox[2] != width:
-            stabilised[-1] = ((last_bbox[0], last_bbox[1], width, last_bbox[3]), last_quad)
-
-    return tuple(stabilised)
-
+    entries = list(mesh)
+    if not entries:
+        return ()
+
+    boxes = np.rint(np.array([bbox for bbox, _ in entries], dtype=np.float64)).astype(np.int64)
+    lefts, tops, rights, bottoms = boxes.T
+
+    # Walking the slices, right = max(round(right), left + 1) with
+    # left = max(previous_right, round(left)) unrolls to a running maximum:
+    # right[i] - i is the largest max(round(right), round(left) + 1)[j] - j
+    # seen so far, starting from one for the implicit zero before the mesh.
+    index = np.arange(len(entries))
+    candidates = np.maximum(rights, lefts + 1) - index
+    rights = np.maximum(np.maximum.accumulate(candidates), 1) + index
+    lefts = np.maximum(np.concatenate(([0], rights[:-1])), lefts)
+
+    # Force the last slice to end exactly at the expected width so there is
+    # no visible gap caused by rounding error.
+    rights[-1] = width
+
+    stabilised_boxes = np.stack((lefts, tops, rights, bottoms), axis=1).tolist()
+    # The quads are passed through per entry, so they need not share a length.
+    return tuple(
+        (tuple(bbox), tuple(map(float, quad))) for bbox, (_, quad) in zip(stabilised_boxes, entries)
+    )